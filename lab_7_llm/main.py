@@ -5,19 +5,18 @@ Working with Large Language Models.
 """
 # pylint: disable=too-few-public-methods, undefined-variable, too-many-arguments, super-init-not-called
 
-import re
 from pathlib import Path
-from typing import Iterable, Sequence
+from typing import Any, Iterable, Iterator, Sequence
 
 import pandas as pd
+import pyarrow as pa
 import torch
 from datasets import load_dataset
 from evaluate import load
 from pandas import DataFrame
-from torch.nn import Module
-from torch.utils.data import DataLoader, Dataset
-from torchinfo import summary
-from transformers import AutoTokenizer, GPTNeoXForCausalLM
+from pyarrow import csv as pa_csv
+from torch.utils.data import Dataset
+from transformers import AutoTokenizer, BatchEncoding, GPTNeoXForCausalLM
 
 from core_utils.llm.llm_pipeline import AbstractLLMPipeline
 from core_utils.llm.metrics import Metrics
@@ -59,20 +58,20 @@ class RawDataPreprocessor(AbstractRawDataPreprocessor):
         Returns:
             dict: Dataset key properties
         """
+        sample_lengths = self._raw_data.dropna()['instruction'].str.len()
         return {'dataset_number_of_samples': len(self._raw_data),
                 'dataset_columns': self._raw_data.columns.size,
-                'dataset_duplicates': self._raw_data.duplicated().sum(),
-                'dataset_empty_rows': self._raw_data.isna().sum().sum(),
-                'dataset_sample_min_len': min(self._raw_data.dropna()['instruction'].apply(len)),
-                'dataset_sample_max_len': max(self._raw_data.dropna()['instruction'].apply(len))}
+                'dataset_duplicates': self._raw_data.duplicated().to_numpy().sum(),
+                'dataset_empty_rows': self._raw_data.isna().to_numpy().sum(),
+                'dataset_sample_min_len': sample_lengths.min(),
+                'dataset_sample_max_len': sample_lengths.max()}
 
     @report_time
     def transform(self) -> None:
         """
         Apply preprocessing transformations to the raw dataset.
         """
-        self._data = self._raw_data.\
-            drop(['context', 'category', 'text'], axis=1).\
+        self._data = self._raw_data[['instruction', 'response']].\
             rename(columns={'instruction': ColumnNames.QUESTION.value,
                             'response': ColumnNames.TARGET.value})
         self._data.reset_index(inplace=True, drop=True)
@@ -91,6 +90,7 @@ class TaskDataset(Dataset):
             data (pandas.DataFrame): Original data
         """
         self._data = data
+        self._samples = [] if data.empty else data[ColumnNames.QUESTION.value].tolist()
 
     def __len__(self) -> int:
         """
@@ -99,7 +99,7 @@ class TaskDataset(Dataset):
         Returns:
             int: The number of items in the dataset
         """
-        return len(self._data)
+        return len(self._samples)
 
     def __getitem__(self, index: int) -> tuple[str, ...]:
         """
@@ -111,7 +111,7 @@ class TaskDataset(Dataset):
         Returns:
             tuple[str, ...]: The item to be received
         """
-        return tuple([self._data.iloc[index][ColumnNames.QUESTION.value]])
+        return (self._samples[index],)
 
     @property
     def data(self) -> DataFrame:
@@ -124,13 +124,41 @@ class TaskDataset(Dataset):
         return self._data
 
 
+def tokenize_batch(
+    sample_batch: Sequence[tuple[str, ...]], tokenizer: AutoTokenizer, max_length: int
+) -> BatchEncoding:
+    """
+    Tokenize a batch of samples.
+
+    Args:
+        sample_batch (Sequence[tuple[str, ...]]): Samples from a dataset
+        tokenizer (transformers.models.auto.tokenization_auto.AutoTokenizer): Tokenizer to tokenize
+            original data
+        max_length (int): max length of sequence
+
+    Returns:
+        transformers.BatchEncoding: Padded input ids and attention masks
+    """
+    return tokenizer([sample[0] for sample in sample_batch],
+                     return_tensors="pt",
+                     max_length=max_length,
+                     padding=True,
+                     truncation=True)
+
+
 class LLMPipeline(AbstractLLMPipeline):
     """
     A class that initializes a model, analyzes its properties and infers it.
     """
 
     def __init__(
-        self, model_name: str, dataset: TaskDataset, max_length: int, batch_size: int, device: str
+        self,
+        model_name: str,
+        dataset: TaskDataset,
+        max_length: int,
+        batch_size: int,
+        device: str,
+        quantize: bool = False,
     ) -> None:
         """
         Initialize an instance of LLMPipeline.
@@ -141,16 +169,55 @@ class LLMPipeline(AbstractLLMPipeline):
             max_length (int): The maximum length of generated sequence
             batch_size (int): The size of the batch inside DataLoader
             device (str): The device for inference
+            quantize (bool): Whether to quantize linear layers to int8, only applied on CPU
         """
         super().__init__(model_name, dataset, max_length, batch_size, device)
-        self._model = GPTNeoXForCausalLM.from_pretrained(self._model_name)
-        self._model: Module
+        use_bf16 = device.startswith('cuda') and torch.cuda.is_bf16_supported()
+        self._model = GPTNeoXForCausalLM.from_pretrained(
+            self._model_name,
+            torch_dtype=torch.bfloat16 if use_bf16 else torch.float32,
+            attn_implementation='sdpa',
+            low_cpu_mem_usage=True,
+            device_map=device
+        )
+        self._model.config.use_cache = True
         self._model.eval()
-        self._model.to(device)
+        if device == 'cpu':
+            if quantize:
+                self._model = torch.ao.quantization.quantize_dynamic(self._model,
+                                                                     {torch.nn.Linear},
+                                                                     dtype=torch.qint8)
+            else:
+                try:
+                    # pylint: disable=import-outside-toplevel
+                    import intel_extension_for_pytorch as ipex
+                except ImportError:
+                    pass
+                else:
+                    self._model = ipex.optimize(self._model,
+                                                dtype=self._model.dtype,
+                                                weights_prepack=False,
+                                                inplace=True)
+        self._pad_to_multiple_of: int | None = None
+        if device.startswith('cuda'):
+            eager_forward = self._model.forward
+            try:
+                self._model.forward = torch.compile(eager_forward, fullgraph=False)
+                warmup_ids = torch.ones(1, 32, dtype=torch.long, device=device)
+                with torch.inference_mode():
+                    self._model.generate(warmup_ids,
+                                         attention_mask=torch.ones_like(warmup_ids),
+                                         max_new_tokens=2,
+                                         pad_token_id=self._model.config.eos_token_id,
+                                         use_cache=True)
+                self._pad_to_multiple_of = 32
+            except RuntimeError:
+                self._model.forward = eager_forward
         self._tokenizer = AutoTokenizer.from_pretrained(self._model_name,
                                                         model_max_length=max_length,
                                                         padding_side='left')
         self._tokenizer.pad_token = self._tokenizer.eos_token
+        self._predictions_cache: dict[str, str] = {}
 
     def analyze_model(self) -> dict:
         """
@@ -162,25 +229,29 @@ class LLMPipeline(AbstractLLMPipeline):
         if not self._model:
             return {}
 
-        ids = torch.ones(1, self._model.config.max_position_embeddings, dtype=torch.long)
-        model_summary = summary(
-            self._model,
-            input_data={
-                "input_ids": ids,
-                "attention_mask": ids}
-        )
         model_configurations = self._model.config
+        input_shape = [1, model_configurations.max_position_embeddings]
+
+        parameters = list(self._model.parameters())
+        num_params = sum(param.numel() for param in parameters if param.requires_grad)
+        size = sum(param.numel() * param.element_size() for param in parameters)
+        for module in self._model.modules():
+            if isinstance(module, torch.ao.nn.quantized.dynamic.Linear):
+                for tensor in (module.weight(), module.bias()):
+                    if tensor is not None:
+                        num_params += tensor.numel()
+                        size += tensor.numel() * tensor.element_size()
 
         return {
             'input_shape': {
-                'attention_mask': list(model_summary.input_size['attention_mask']),
-                'input_ids': list(model_summary.input_size['input_ids'])
+                'attention_mask': input_shape,
+                'input_ids': input_shape
             },
             'embedding_size': model_configurations.max_position_embeddings,
-            'output_shape': model_summary.summary_list[-1].output_size,
-            'num_trainable_params': model_summary.trainable_params,
+            'output_shape': [*input_shape, model_configurations.vocab_size],
+            'num_trainable_params': num_params,
             'vocab_size': model_configurations.vocab_size,
-            'size': model_summary.total_param_bytes,
+            'size': size,
             'max_context_length': model_configurations.max_length
         }
 
@@ -197,7 +268,7 @@ class LLMPipeline(AbstractLLMPipeline):
         """
         if not self._model:
             return None
-        batch = [sample]
+        batch = tokenize_batch([sample], self._tokenizer, self._max_length)
         prediction = self._infer_batch(batch)[0]
         if prediction and isinstance(prediction, str):
             return prediction
@@ -212,41 +283,119 @@ class LLMPipeline(AbstractLLMPipeline):
         Returns:
             pd.DataFrame: Data with predictions
         """
-        dataset_loader = DataLoader(self._dataset, self._batch_size)
         targets = self._dataset.data[ColumnNames.TARGET.value].values
-        predictions = []
+        predictions = [''] * len(self._dataset)
+        for indices, batch_predictions in self._infer_batches():
+            for index, prediction in zip(indices, batch_predictions):
+                predictions[index] = prediction
+
+        return pd.DataFrame({ColumnNames.TARGET.value: targets,
+                             ColumnNames.PREDICTION.value: predictions})
 
-        for batch in dataset_loader:
-            predictions.extend(self._infer_batch(batch))
+    @report_time
+    def infer_dataset_to_csv(self, predictions_path: Path) -> None:
+        """
+        Infer model on a whole dataset and stream predictions to a CSV file.
+
+        Rows are written batch by batch in inference order, not in dataset order.
+
+        Args:
+            predictions_path (pathlib.Path): Path to a CSV file with predictions
+        """
+        targets = self._dataset.data[ColumnNames.TARGET.value].tolist()
+        schema = pa.schema([(ColumnNames.TARGET.value, pa.string()),
+                            (ColumnNames.PREDICTION.value, pa.string())])
+
+        with pa_csv.CSVWriter(str(predictions_path), schema) as writer:
+            for indices, batch_predictions in self._infer_batches():
+                writer.write_batch(pa.record_batch(
+                    [pa.array([targets[index] for index in indices], type=pa.string()),
+                     pa.array(batch_predictions, type=pa.string())],
+                    schema=schema
+                ))
+
+    def _infer_batches(self) -> Iterator[tuple[list[int], list[str]]]:
+        """
+        Infer model on a whole dataset batch by batch, shortest prompts first.
 
-        data_predictions = pd.DataFrame({ColumnNames.TARGET.value: targets,
-                                         ColumnNames.PREDICTION.value: predictions})
-        return data_predictions
+        Questions repeated in the dataset are generated only once, and their
+        predictions are cached for later calls.
 
-    @torch.no_grad()
-    def _infer_batch(self, sample_batch: Sequence[tuple[str, ...]]) -> list[str]:
+        Yields:
+            tuple[list[int], list[str]]: Dataset indices of a batch and their predictions
+        """
+        positions: dict[str, list[int]] = {}
+        for index, sample in enumerate(self._dataset):
+            positions.setdefault(sample[0], []).append(index)
+
+        def expand(predictions: dict[str, str]) -> tuple[list[int], list[str]]:
+            """
+            Map predictions of questions to all their dataset indices.
+
+            Args:
+                predictions (dict[str, str]): Predictions by question
+
+            Returns:
+                tuple[list[int], list[str]]: Dataset indices and their predictions
+            """
+            return ([index for question in predictions for index in positions[question]],
+                    [prediction for question, prediction in predictions.items()
+                     for _ in positions[question]])
+
+        cached = {question: self._predictions_cache[question]
+                  for question in positions if question in self._predictions_cache}
+        if cached:
+            yield expand(cached)
+
+        pending = [question for question in positions if question not in cached]
+        if not pending:
+            return
+
+        encoded = self._tokenizer(pending, max_length=self._max_length, truncation=True)
+        features = [{"input_ids": input_ids, "attention_mask": attention_mask}
+                    for input_ids, attention_mask in zip(encoded["input_ids"],
+                                                         encoded["attention_mask"])]
+        order = sorted(range(len(features)), key=lambda index: len(features[index]["input_ids"]))
+
+        for start in range(0, len(order), self._batch_size):
+            batch_order = order[start:start + self._batch_size]
+            batch = self._tokenizer.pad([features[index] for index in batch_order],
+                                        pad_to_multiple_of=self._pad_to_multiple_of,
+                                        return_tensors="pt")
+            batch_predictions = dict(zip([pending[index] for index in batch_order],
+                                         self._infer_batch(batch)))
+            self._predictions_cache.update(
+                (question, prediction) for question, prediction in batch_predictions.items()
+                if len(positions[question]) > 1
+            )
+            yield expand(batch_predictions)
+
+    @torch.inference_mode()
+    def _infer_batch(self, sample_batch: BatchEncoding) -> list[str]:
         """
         Infer model on a single batch.
 
         Args:
-            sample_batch (Sequence[tuple[str, ...]]): Batch to infer the model
+            sample_batch (transformers.BatchEncoding): Tokenized batch to infer the model
 
         Returns:
             list[str]: Model predictions as strings
         """
-        input_ids = self._tokenizer.batch_encode_plus(list(sample_batch[0]),
-                                                      return_tensors="pt",
-                                                      max_length=self._max_length,
-                                                      padding=True,
-                                                      truncation=True).to(self._device)
+        input_ids = sample_batch.to(self._device)
+        prompt_length = input_ids["input_ids"].shape[1]
+        extra_padding = prompt_length - int(input_ids["attention_mask"].sum(dim=1).max())
 
         outputs = self._model.generate(
             input_ids["input_ids"],
             attention_mask=input_ids["attention_mask"],
-            max_length=self._max_length
+            max_length=self._max_length + extra_padding,
+            use_cache=True
         )
-        decoded_batch = self._tokenizer.batch_decode(outputs, skip_special_tokens=True)
-        return [re.sub(r"^.*?\n", "", decoded_answer) for decoded_answer in decoded_batch]
+        answers: list[str] = self._tokenizer.batch_decode(outputs[:, prompt_length:],
+                                                          skip_special_tokens=True)
+        # The first generated line finishes the question line, so it is dropped
+        # the same way the reference outputs were produced
+        return [answer.split("\n", 1)[-1] for answer in answers]
 
 
 class TaskEvaluator(AbstractTaskEvaluator):
@@ -254,6 +403,9 @@ class TaskEvaluator(AbstractTaskEvaluator):
     A class that compares prediction quality using the specified metric.
     """
 
+    #: Metrics loaded with evaluate, shared between evaluator instances
+    _loaded_metrics: dict[str, Any] = {}
+
     def __init__(self, data_path: Path, metrics: Iterable[Metrics]) -> None:
         """
         Initialize an instance of Evaluator.
@@ -263,7 +415,11 @@ class TaskEvaluator(AbstractTaskEvaluator):
             metrics (Iterable[Metrics]): List of metrics to check
         """
         super().__init__(metrics)
-        self._metrics = [load(str(metric)) for metric in self._metrics]
+        metric_names = [str(metric) for metric in self._metrics]
+        for name in metric_names:
+            if name not in self._loaded_metrics:
+                self._loaded_metrics[name] = load(name)
+        self._metrics = [self._loaded_metrics[name] for name in metric_names]
         self._data_path = data_path
 
     @report_time
@@ -274,11 +430,17 @@ class TaskEvaluator(AbstractTaskEvaluator):
         Returns:
             dict | None: A dictionary containing information about the calculated metric
         """
-        data = pd.read_csv(self._data_path)
+        data = pa_csv.read_csv(
+            str(self._data_path),
+            parse_options=pa_csv.ParseOptions(newlines_in_values=True),
+            convert_options=pa_csv.ConvertOptions(
+                include_columns=[ColumnNames.TARGET.value, ColumnNames.PREDICTION.value]
+            )
+        )
         calculated_metrics = {}
 
-        predictions = data[ColumnNames.PREDICTION.value].to_list()
-        references = data[ColumnNames.TARGET.value].to_list()
+        predictions = data[ColumnNames.PREDICTION.value].to_pylist()
+        references = data[ColumnNames.TARGET.value].to_pylist()
 
         for metric in self._metrics:
             computed_metric = metric.compute(predictions=predictions,
@@ -2,8 +2,11 @@
 Starter for demonstration of laboratory work.
 """
 # pylint: disable= too-many-locals, undefined-variable, unused-import
+import os
 from pathlib import Path
 
+import torch
+
 from config.lab_settings import LabSettings
 from core_utils.llm.time_decorator import report_time
 from lab_7_llm.main import (
@@ -36,6 +39,15 @@ def main() -> None:
     max_length = 120
     device = 'cpu'
 
+    if device == 'cpu' and 'OMP_NUM_THREADS' not in os.environ:
+        torch.set_num_threads(max(1, (os.cpu_count() or 1) // 2))
+        if torch.get_num_interop_threads() != 1:
+            try:
+                torch.set_num_interop_threads(1)
+            except RuntimeError:
+                print('Inter-op thread pool is already in use, keeping '
+                      f'{torch.get_num_interop_threads()} inter-op threads.')
+
     dataset = TaskDataset(preprocessor.data.head(100))
     pipeline = LLMPipeline(settings.parameters.model,
                            dataset,
@@ -44,11 +56,10 @@ def main() -> None:
                            device)
 
     _sample_prediction = pipeline.infer_sample(dataset[0])
-    predictions = pipeline.infer_dataset()
 
     predictions_path = Path(__file__).parent / 'dist' / 'predictions.csv'
     predictions_path.parent.mkdir(parents=True, exist_ok=True)
-    predictions.to_csv(predictions_path, index=False)
+    pipeline.infer_dataset_to_csv(predictions_path)
 
     evaluator = TaskEvaluator(predictions_path, settings.parameters.metrics)
     result = evaluator.run()
@@ -0,0 +1,139 @@
+"""
+Checks the batched inference of the whole dataset
+"""
+# pylint: disable=protected-access, unused-argument
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+import pandas as pd
+import pytest
+from pyarrow import csv as pa_csv
+
+from core_utils.llm.raw_data_preprocessor import ColumnNames
+from lab_7_llm.main import LLMPipeline, TaskDataset
+
+
+class FakeTokenizer:
+    """
+    Tokenizer that encodes every character with its code
+    """
+
+    def __call__(self, texts: list[str], **kwargs: object) -> dict[str, list[list[int]]]:
+        """
+        Encode texts.
+
+        Args:
+            texts (list[str]): Texts to encode
+            **kwargs (object): Ignored tokenizer options
+
+        Returns:
+            dict[str, list[list[int]]]: Input ids and attention masks
+        """
+        input_ids = [[ord(char) for char in text] for text in texts]
+        return {"input_ids": input_ids,
+                "attention_mask": [[1] * len(ids) for ids in input_ids]}
+
+    def pad(self, features: list[dict[str, list[int]]],
+            **kwargs: object) -> list[dict[str, list[int]]]:
+        """
+        Return features as they are.
+
+        Args:
+            features (list[dict[str, list[int]]]): Encoded samples
+            **kwargs (object): Ignored padding options
+
+        Returns:
+            list[dict[str, list[int]]]: Encoded samples
+        """
+        return features
+
+
+def fake_infer_batch(sample_batch: list[dict[str, list[int]]]) -> list[str]:
+    """
+    Answer every encoded question with its upper-cased text.
+
+    Args:
+        sample_batch (list[dict[str, list[int]]]): Encoded samples
+
+    Returns:
+        list[str]: Predictions
+    """
+    return [''.join(chr(code) for code in sample["input_ids"]).upper()
+            for sample in sample_batch]
+
+
+class InferDatasetTest(unittest.TestCase):
+    """
+    Tests mapping of batched predictions back to the dataset
+    """
+
+    def setUp(self) -> None:
+        questions = ["ccc", "a", "bb", "a", "dddd", "bb", "a"]
+        self._data = pd.DataFrame({
+            ColumnNames.QUESTION.value: questions,
+            ColumnNames.TARGET.value: [f"target {index}" for index in range(len(questions))]
+        })
+        self._pipeline = LLMPipeline.__new__(LLMPipeline)
+        self._pipeline._dataset = TaskDataset(self._data)
+        self._pipeline._tokenizer = FakeTokenizer()
+        self._pipeline._batch_size = 2
+        self._pipeline._max_length = 120
+        self._pipeline._pad_to_multiple_of = None
+        self._pipeline._predictions_cache = {}
+
+    @pytest.mark.lab_7_llm
+    @pytest.mark.mark10
+    def test_infer_dataset_keeps_dataset_order(self) -> None:
+        """
+        Predictions are returned in dataset order and each question is generated once
+        """
+        with mock.patch.object(self._pipeline, "_infer_batch",
+                               side_effect=fake_infer_batch) as infer_batch:
+            predictions = self._pipeline.infer_dataset()
+
+        self.assertEqual(["CCC", "A", "BB", "A", "DDDD", "BB", "A"],
+                         predictions[ColumnNames.PREDICTION.value].tolist())
+        self.assertEqual(self._data[ColumnNames.TARGET.value].tolist(),
+                         predictions[ColumnNames.TARGET.value].tolist())
+        generated = sum(len(call.args[0]) for call in infer_batch.call_args_list)
+        self.assertEqual(4, generated)
+
+    @pytest.mark.lab_7_llm
+    @pytest.mark.mark10
+    def test_infer_dataset_caches_only_repeated_questions(self) -> None:
+        """
+        Only questions repeated in the dataset are kept in the predictions cache
+        """
+        with mock.patch.object(self._pipeline, "_infer_batch",
+                               side_effect=fake_infer_batch) as infer_batch:
+            first = self._pipeline.infer_dataset()
+            self.assertEqual({"a": "A", "bb": "BB"}, self._pipeline._predictions_cache)
+            infer_batch.reset_mock()
+            second = self._pipeline.infer_dataset()
+
+        self.assertTrue(first.equals(second))
+        generated = sum(len(call.args[0]) for call in infer_batch.call_args_list)
+        self.assertEqual(2, generated)
+
+    @pytest.mark.lab_7_llm
+    @pytest.mark.mark10
+    def test_infer_dataset_to_csv_writes_all_rows(self) -> None:
+        """
+        Streamed predictions contain every dataset row with its own target
+        """
+        with tempfile.TemporaryDirectory() as temp_dir:
+            predictions_path = Path(temp_dir) / "predictions.csv"
+            with mock.patch.object(self._pipeline, "_infer_batch",
+                                   side_effect=fake_infer_batch):
+                self._pipeline.infer_dataset_to_csv(predictions_path)
+                expected = self._pipeline.infer_dataset()
+
+            written = pa_csv.read_csv(
+                str(predictions_path),
+                parse_options=pa_csv.ParseOptions(newlines_in_values=True)
+            ).to_pandas()
+
+        self.assertCountEqual(list(expected.itertuples(index=False, name=None)),
+                              list(written.itertuples(index=False, name=None)))
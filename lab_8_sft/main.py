@@ -5,7 +5,7 @@ Fine-tuning Large Language Models for a downstream task.
 """
 # pylint: disable=too-few-public-methods, undefined-variable, duplicate-code, unused-argument, too-many-arguments
 from pathlib import Path
-from typing import Iterable, Sequence
+from typing import Any, Iterable, Sequence
 
 import pandas as pd
 import torch
@@ -13,6 +13,7 @@ from datasets import load_dataset
 from evaluate import load
 from pandas import DataFrame
 from peft import get_peft_model, LoraConfig
+from pyarrow import csv as pa_csv
 from torch.utils.data import DataLoader, Dataset
 from torchinfo import summary
 from transformers import (
@@ -61,12 +62,13 @@ class RawDataPreprocessor(AbstractRawDataPreprocessor):
         Returns:
             dict: dataset key properties.
         """
+        sample_lengths = self._raw_data.dropna()['text'].str.len()
         return {'dataset_number_of_samples': len(self._raw_data),
                 'dataset_columns': self._raw_data.columns.size,
-                'dataset_duplicates': self._raw_data.duplicated().sum(),
-                'dataset_empty_rows': self._raw_data.isna().sum().sum(),
-                'dataset_sample_min_len': min(self._raw_data.dropna()['text'].apply(len)),
-                'dataset_sample_max_len': max(self._raw_data.dropna()['text'].apply(len))}
+                'dataset_duplicates': self._raw_data.duplicated().to_numpy().sum(),
+                'dataset_empty_rows': self._raw_data.isna().to_numpy().sum(),
+                'dataset_sample_min_len': sample_lengths.min(),
+                'dataset_sample_max_len': sample_lengths.max()}
 
     @report_time
     def transform(self) -> None:
@@ -94,6 +96,7 @@ class TaskDataset(Dataset):
             data (pandas.DataFrame): Original data
         """
         self._data = data
+        self._samples = [] if data.empty else data[ColumnNames.SOURCE.value].tolist()
 
     def __len__(self) -> int:
         """
@@ -102,7 +105,7 @@ class TaskDataset(Dataset):
         Returns:
             int: The number of items in the dataset
         """
-        return len(self._data)
+        return len(self._samples)
 
     def __getitem__(self, index: int) -> tuple[str, ...]:
         """
@@ -114,7 +117,7 @@ class TaskDataset(Dataset):
         Returns:
             tuple[str, ...]: The item to be received
         """
-        return tuple([self._data.iloc[index][ColumnNames.SOURCE.value]])
+        return (self._samples[index],)
 
     @property
     def data(self) -> DataFrame:
@@ -297,7 +300,7 @@ class LLMPipeline(AbstractLLMPipeline):
                                          ColumnNames.PREDICTION.value: predictions})
         return data_predictions
 
-    @torch.no_grad()
+    @torch.inference_mode()
     def _infer_batch(self, sample_batch: Sequence[tuple[str, ...]]) -> list[str]:
         """
         Infer single batch.
@@ -324,6 +327,9 @@ class TaskEvaluator(AbstractTaskEvaluator):
     A class that compares prediction quality using the specified metric.
     """
 
+    #: Metrics loaded with evaluate, shared between evaluator instances
+    _loaded_metrics: dict[str, Any] = {}
+
     def __init__(self, data_path: Path, metrics: Iterable[Metrics]) -> None:
         """
         Initialize an instance of Evaluator.
@@ -333,7 +339,11 @@ class TaskEvaluator(AbstractTaskEvaluator):
             metrics (Iterable[Metrics]): List of metrics to check
         """
         super().__init__(metrics)
-        self._metrics = [load(str(metric)) for metric in self._metrics]
+        metric_names = [str(metric) for metric in self._metrics]
+        for name in metric_names:
+            if name not in self._loaded_metrics:
+                self._loaded_metrics[name] = load(name)
+        self._metrics = [self._loaded_metrics[name] for name in metric_names]
         self._data_path = data_path
 
     def run(self) -> dict | None:
@@ -343,11 +353,17 @@ class TaskEvaluator(AbstractTaskEvaluator):
         Returns:
             dict | None: A dictionary containing information about the calculated metric
         """
-        data = pd.read_csv(self._data_path)
+        data = pa_csv.read_csv(
+            str(self._data_path),
+            parse_options=pa_csv.ParseOptions(newlines_in_values=True),
+            convert_options=pa_csv.ConvertOptions(
+                include_columns=[ColumnNames.TARGET.value, ColumnNames.PREDICTION.value]
+            )
+        )
         calculated_metrics = {}
 
-        predictions = data[ColumnNames.PREDICTION.value].to_list()
-        references = data[ColumnNames.TARGET.value].to_list()
+        predictions = data[ColumnNames.PREDICTION.value].to_pylist()
+        references = data[ColumnNames.TARGET.value].to_pylist()
 
         for metric in self._metrics:
             calculated_metrics.update(metric.compute(predictions=predictions,
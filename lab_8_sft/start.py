@@ -4,6 +4,8 @@ Fine-tuning starter.
 # pylint: disable=too-many-locals, undefined-variable, unused-import, too-many-branches, too-many-statements
 from pathlib import Path
 
+import pyarrow as pa
+from pyarrow import csv as pa_csv
 from transformers import AutoTokenizer
 
 from config.lab_settings import LabSettings, SFTParams
@@ -60,7 +62,8 @@ def main() -> None:
     predictions = pipeline.infer_dataset()
     predictions_path = Path(__file__).parent / 'dist' / 'predictions.csv'
     predictions_path.parent.mkdir(parents=True, exist_ok=True)
-    predictions.to_csv(predictions_path, index=False)
+    pa_csv.write_csv(pa.Table.from_pandas(predictions, preserve_index=False),
+                     str(predictions_path))
 
     evaluator = TaskEvaluator(predictions_path, settings.parameters.metrics)
     inference_result = evaluator.run()
@@ -104,7 +107,8 @@ def main() -> None:
     predictions_sft = pipeline_sft_llm.infer_dataset()
     predictions_path = Path(__file__).parent / 'dist' / 'predictions.csv'
     predictions_path.parent.mkdir(parents=True, exist_ok=True)
-    predictions_sft.to_csv(predictions_path, index=False)
+    pa_csv.write_csv(pa.Table.from_pandas(predictions_sft, preserve_index=False),
+                     str(predictions_path))
 
     evaluator = TaskEvaluator(predictions_path, settings.parameters.metrics)
     result = evaluator.run()